@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 import yaml  # Add this import at the top
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
 import socket
+import asyncio
+import select
 import json
 import time as time_module
 import random
 import threading
-from datetime import datetime, time as time_class, timedelta
+import queue
+import atexit
+from collections import deque, namedtuple
+from datetime import datetime, time as time_class
 import tkinter as tk
 from tkinter import ttk, messagebox, font
 import psutil
 import platform
+import os
+try:
+    import orjson  # Faster payload serialization, optional
+except ImportError:
+    orjson = None
+try:
+    import numpy as np  # Batched random draws for simulation, optional
+except ImportError:
+    np = None
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 #import automationhat  # Only used when SIMULATION = False
 import smtplib
 from email.mime.text import MIMEText
@@ -19,23 +37,73 @@ from email.mime.multipart import MIMEMultipart
 
 # ----------------------  JSON file for counter persistence
 COUNTERS_FILE = "production_counters.json"
+COUNTERS_FLUSH_INTERVAL = 5.0  # Seconds between coalesced counter writes
+_counters_dirty = threading.Event()
+_counters_lock = threading.Lock()
 
 def load_counters():
     """Load counters from JSON file"""
     try:
         with open(COUNTERS_FILE, 'r') as f:
-            counters = json.load(f)
-            return counters.get('qtBon', 0), counters.get('qtRejet', 0)
+            saved = json.load(f)
+            return saved.get('qtBon', 0), saved.get('qtRejet', 0)
     except (FileNotFoundError, json.JSONDecodeError):
         return 0, 0  # Default values if file doesn't exist or is invalid
 
-def save_counters(qtBon, qtRejet):
-    """Save counters to JSON file"""
+def save_counters(counters):
+    """Save a consistent snapshot of the counters to JSON file via a temp file
+    so a partial write never corrupts it"""
+    qtBon, qtRejet = counters.snapshot()
+    tmp_file = COUNTERS_FILE + ".tmp"
     try:
-        with open(COUNTERS_FILE, 'w') as f:
-            json.dump({'qtBon': qtBon, 'qtRejet': qtRejet}, f)
+        with _counters_lock:
+            with open(tmp_file, 'w') as f:
+                json.dump({'qtBon': qtBon, 'qtRejet': qtRejet}, f)
+            os.replace(tmp_file, COUNTERS_FILE)
     except Exception as e:
-        logger.error(f"Error saving counters: {str(e)}")
+        logger.error("Error saving counters: %s", e)
+
+def mark_counters_dirty():
+    """Request a counter save; writes are coalesced by counters_flush_loop"""
+    _counters_dirty.set()
+
+class Counters:
+    """Good/reject production counters shared by the GUI, data and simulation threads"""
+    __slots__ = ('good', 'reject', '_lock', 'on_change')
+
+    def __init__(self, good=0, reject=0):
+        self.good = good
+        self.reject = reject
+        self._lock = threading.Lock()
+        self.on_change = None  # Called without the lock held after every change
+
+    def inc_good(self):
+        self.add(1, 0)
+
+    def inc_reject(self):
+        self.add(0, 1)
+
+    def add(self, good, reject):
+        """Add several parts at once and schedule a save"""
+        with self._lock:
+            self.good += good
+            self.reject += reject
+        mark_counters_dirty()
+        if self.on_change is not None:
+            self.on_change()
+
+    def reset(self):
+        with self._lock:
+            self.good = 0
+            self.reject = 0
+        mark_counters_dirty()
+        if self.on_change is not None:
+            self.on_change()
+
+    def snapshot(self):
+        """Return (good, reject) read together under the lock"""
+        with self._lock:
+            return self.good, self.reject
 # ---------------------- Configuration ----------------------
 def parse_time(time_str):
     """Convert time string in format 'HH:MM:SS' to time object"""
@@ -43,38 +111,48 @@ def parse_time(time_str):
         return datetime.strptime(time_str, "%H:%M:%S").time()
     return time_str
 
+Shift = namedtuple('Shift', 'start_min end_min name')
+
+def parse_shift_schedule(shifts):
+    """Convert the config shift list into Shift tuples with minute-of-day bounds"""
+    schedule = []
+    for shift in shifts:
+        start = parse_time(shift['start'])
+        end = parse_time(shift['end'])
+        schedule.append(Shift(start.hour * 60 + start.minute, end.hour * 60 + end.minute, shift['name']))
+    return schedule
+
+def build_shift_table(shift_schedule):
+    """Build a minute-of-day -> shift name lookup table (1440 entries)"""
+    table = [None] * 1440
+    # Fill in reverse so the first matching shift wins, as in a linear scan
+    for start_min, end_min, name in reversed(shift_schedule):
+        if start_min > end_min:  # Shift wraps past midnight
+            table[start_min:1440] = [name] * (1440 - start_min)
+            table[0:end_min] = [name] * end_min
+        else:
+            table[start_min:end_min] = [name] * (end_min - start_min)
+    return table
+
 def load_config():
     try:
         with open('config.yaml', 'r') as f:
-            config = yaml.safe_load(f)
-        
-        # Convert string times to time objects for shift schedule
-        for shift in config['SHIFT_SCHEDULE']:
-            shift['start'] = parse_time(shift['start'])
-            shift['end'] = parse_time(shift['end'])
+            config = yaml.load(f, Loader=YamlLoader)
         
+        # Shift times stay as strings here; SHIFT_SCHEDULE holds the parsed form
         return config
     except Exception as e:
         print(f"Error loading config: {e}")
         return None
 
 def save_config(config):
-    """Save configuration to YAML file, converting time objects to strings"""
+    """Save configuration to YAML file"""
     try:
-        # Create a copy to avoid modifying the original
-        config_copy = config.copy()
-        config_copy['SHIFT_SCHEDULE'] = [shift.copy() for shift in config['SHIFT_SCHEDULE']]
-        
-        # Convert time objects to strings
-        for shift in config_copy['SHIFT_SCHEDULE']:
-            shift['start'] = shift['start'].strftime("%H:%M:%S")
-            shift['end'] = shift['end'].strftime("%H:%M:%S")
-        
         with open('config.yaml', 'w') as f:
-            yaml.dump(config_copy, f)
+            yaml.dump(config, f, Dumper=YamlDumper)
         return True
     except Exception as e:
-        logger.error(f"Error saving config: {e}")
+        logger.error("Error saving config: %s", e)
         return False
 
 # Load configuration
@@ -90,10 +168,20 @@ MACHINE_ID = config['MACHINE_ID']
 SAMPLING_INTERVAL = config['SAMPLING_INTERVAL']
 MAX_LOG_SIZE = config['MAX_LOG_SIZE']
 LOG_BACKUP_COUNT = config['LOG_BACKUP_COUNT']
-SHIFT_SCHEDULE = config['SHIFT_SCHEDULE']
+SHIFT_SCHEDULE = parse_shift_schedule(config['SHIFT_SCHEDULE'])
+_SHIFT_BY_MINUTE = build_shift_table(SHIFT_SCHEDULE)
 STOP_REASONS = config['STOP_REASONS']
 
 # ---------------------- Logging Setup ----------------------
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records unformatted.
+
+    The stock prepare() renders the message and traceback on the calling
+    thread; records never leave this process, so leave that to the listener.
+    """
+    def prepare(self, record):
+        return record
+
 def setup_logging():
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
@@ -112,108 +200,317 @@ def setup_logging():
         '%(levelname)s: %(message)s'
     ))
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Callers only enqueue records; formatting and I/O run on the listener thread
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    logger.addHandler(_DeferredQueueHandler(log_queue))
     return logger
 
 logger = setup_logging()
 # ---------------------- Email Notification ----------------------
+SMTP_IDLE_TIMEOUT = 60  # Seconds an unused SMTP connection is kept open
+_mail_q = queue.Queue()
 
-def send_email_notification(stop_reason, stop_time):
-    """Send email notification about machine stop in a separate thread"""
-    def send_email():
+def build_stop_email(email_config, stop_reason, stop_time):
+    """Build the stop notification message and return it with its recipient"""
+    recipient = email_config['RECIPIENTS'].get(stop_reason, email_config['RECIPIENTS']['Other'])
+    
+    msg = MIMEMultipart()
+    msg['From'] = email_config['EMAIL_FROM']
+    msg['To'] = recipient
+    msg['Subject'] = f"Machine {MACHINE_ID} Stopped - {stop_reason}"
+    
+    body = f"""
+    Machine Stop Notification
+    
+    Machine ID: {MACHINE_ID}
+    Stop Reason: {stop_reason}
+    Stop Time: {stop_time.strftime('%Y-%m-%d %H:%M:%S')}
+    Current Shift: {get_current_shift()}
+    
+    This is an automated notification.
+    """
+    
+    msg.attach(MIMEText(body, 'plain'))
+    return msg, recipient
+
+def _smtp_connect(email_config):
+    server = smtplib.SMTP(email_config['SMTP_SERVER'], email_config['SMTP_PORT'], timeout=30)
+    server.starttls()
+    server.login(email_config['EMAIL_FROM'], email_config['EMAIL_PASSWORD'])
+    return server
+
+def _smtp_close(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def email_worker():
+    """Send queued stop notifications, reusing one SMTP connection between them"""
+    server = None
+    while True:
+        try:
+            item = _mail_q.get(timeout=SMTP_IDLE_TIMEOUT if server else None)
+        except queue.Empty:
+            _smtp_close(server)  # Idle: the server would drop us anyway
+            server = None
+            continue
+        if item is None:
+            break
+        stop_reason, stop_time = item
         try:
             if 'EMAIL_CONFIG' not in config:
                 logger.warning("Email configuration not found")
-                return
-
-            email_config = config['EMAIL_CONFIG']
-            recipient = email_config['RECIPIENTS'].get(stop_reason, email_config['RECIPIENTS']['Other'])
-            
-            msg = MIMEMultipart()
-            msg['From'] = email_config['EMAIL_FROM']
-            msg['To'] = recipient
-            msg['Subject'] = f"Machine {MACHINE_ID} Stopped - {stop_reason}"
-            
-            body = f"""
-            Machine Stop Notification
-            
-            Machine ID: {MACHINE_ID}
-            Stop Reason: {stop_reason}
-            Stop Time: {stop_time.strftime('%Y-%m-%d %H:%M:%S')}
-            Current Shift: {get_current_shift()}
-            
-            This is an automated notification.
-            """
-            
-            msg.attach(MIMEText(body, 'plain'))
+                continue
             
-            with smtplib.SMTP(email_config['SMTP_SERVER'], email_config['SMTP_PORT']) as server:
-                server.starttls()
-                server.login(email_config['EMAIL_FROM'], email_config['EMAIL_PASSWORD'])
+            email_config = config['EMAIL_CONFIG']
+            msg, recipient = build_stop_email(email_config, stop_reason, stop_time)
+            if server is None:
+                server = _smtp_connect(email_config)
+            try:
                 server.send_message(msg)
-                
-            logger.info(f"Email notification sent to {recipient} for stop reason: {stop_reason}")
+            except smtplib.SMTPServerDisconnected:
+                # Reused connection went stale; reconnect once and retry
+                server = _smtp_connect(email_config)
+                server.send_message(msg)
+            
+            logger.info("Email notification sent to %s for stop reason: %s", recipient, stop_reason)
         except Exception as e:
-            logger.error(f"Failed to send email notification: {str(e)}")
-    
-    # Start email thread
-    email_thread = threading.Thread(target=send_email, daemon=True)
-    email_thread.start()
+            logger.error("Failed to send email notification: %s", e)
+            if server is not None:
+                _smtp_close(server)
+                server = None
+    if server is not None:
+        _smtp_close(server)
+
+_email_thread = threading.Thread(target=email_worker, daemon=True, name='email')
+_email_thread.start()
+
+def stop_email_worker(timeout=5):
+    """Let the email worker finish queued notifications and quit SMTP"""
+    _mail_q.put(None)
+    _email_thread.join(timeout)
+
+atexit.register(stop_email_worker)
+
+def send_email_notification(stop_reason, stop_time):
+    """Queue an email notification about a machine stop; never blocks the caller"""
+    _mail_q.put((stop_reason, stop_time))
 
 # ---------------------- Global Counters ----------------------
-qtBon, qtRejet = load_counters()  # Load counters from file
+counters = Counters(*load_counters())  # Load counters from file
 stop_event = threading.Event()
+sampler_wakeup = threading.Event()  # Wakes data_loop early: settings change or shutdown
 last_successful_transmission = None
+last_successful_transmission_mono = None  # time.monotonic() of the last success
 transmission_errors = 0
 current_stop_reason = None
 stop_time = None
 last_stop_info = {"reason": None, "duration": None, "start_time": None}
-historical_metrics = []
+
+# Newest payload from the data thread for the GUI; unread payloads are replaced
+latest_payload = queue.Queue(maxsize=1)
+_last_published = None
+# Metrics the GUI draws from the payload, shown rounded to whole numbers
+_DISPLAY_METRICS = ('cpu_percent', 'memory_percent', 'temperature', 'disk_percent')
+
+def request_stop():
+    """Signal all worker threads to stop and wake the sampler immediately"""
+    stop_event.set()
+    sampler_wakeup.set()
+
+def _display_key(payload):
+    """The part of a payload that update_gui actually draws"""
+    metrics = payload.get('system_metrics') or {}
+    return (payload.get('state'), payload.get('shift'), metrics.get('boot_time'),
+            tuple(None if metrics.get(name) is None else round(metrics[name])
+                  for name in _DISPLAY_METRICS))
+
+def publish_payload(payload):
+    """Hand the newest payload to the GUI, dropping any it has not read yet.
+    Returns False (and queues nothing) when nothing the GUI draws has changed."""
+    global _last_published
+    key = _display_key(payload)
+    if key == _last_published:
+        return False
+    _last_published = key
+    try:
+        latest_payload.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        latest_payload.put_nowait(payload)
+    except queue.Full:
+        pass
+    return True
+
+def counters_flush_loop():
+    """Persist dirty counters at most every COUNTERS_FLUSH_INTERVAL seconds"""
+    while not stop_event.wait(COUNTERS_FLUSH_INTERVAL):
+        if _counters_dirty.is_set():
+            _counters_dirty.clear()
+            save_counters(counters)
+    # Final flush on shutdown
+    if _counters_dirty.is_set():
+        _counters_dirty.clear()
+        save_counters(counters)
+
+# Last 60 system metric samples, oldest evicted automatically
+MetricSample = namedtuple('MetricSample', 'cpu mem temp disk net_sent net_recv boot procs')
+historical_metrics = deque(maxlen=60)
 
 # ---------------------- System Metrics Functions ----------------------
+# Prime psutil's CPU time delta so later non-blocking calls return a real value
+psutil.cpu_percent(interval=None)
+
+# Values that never change while running are read once
+_PLATFORM = platform.system()
+_BOOT_TIME = psutil.boot_time()
+_WMI = None  # Created on first use (Windows only)
+
+# Linux sysfs/procfs files are kept open and re-read with pread each sample
+def _open_cached_fd(path):
+    """Open a Linux sysfs/procfs file for repeated pread, or None if unavailable"""
+    if _PLATFORM != 'Linux':
+        return None
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+def _pread_all(fd, chunk=4096):
+    """Read a whole sysfs/procfs file from offset 0 on a cached fd"""
+    parts = []
+    offset = 0
+    while True:
+        buf = os.pread(fd, chunk, offset)
+        if not buf:
+            break
+        parts.append(buf)
+        offset += len(buf)
+    return b''.join(parts)
+
+THERMAL_ZONE_FILE = '/sys/class/thermal/thermal_zone0/temp'
+NET_DEV_FILE = '/proc/net/dev'
+MEMINFO_FILE = '/proc/meminfo'
+_thermal_fd = _open_cached_fd(THERMAL_ZONE_FILE)
+_net_dev_fd = _open_cached_fd(NET_DEV_FILE)
+_meminfo_fd = _open_cached_fd(MEMINFO_FILE)
+
+# Slow collectors (disk usage, process count) only refresh every Nth sample
+SLOW_METRICS_EVERY = 10
+_slow_cache = {'ticks': 0, 'procs': 0, 'disk': 0.0}
+
 def get_cpu_temperature():
+    global _WMI, _thermal_fd
     try:
-        if platform.system() == 'Linux':
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+        if _PLATFORM == 'Linux':
+            if _thermal_fd is not None:
+                try:
+                    return int(os.pread(_thermal_fd, 16, 0)) / 1000
+                except (OSError, ValueError):
+                    os.close(_thermal_fd)
+                    _thermal_fd = None
+            with open(THERMAL_ZONE_FILE, 'r') as f:
                 temp = int(f.read()) / 1000
             return temp
-        elif platform.system() == 'Windows':
+        elif _PLATFORM == 'Windows':
             try:
-                import wmi
-                w = wmi.WMI(namespace="root\\wmi")
-                temp_info = w.MSAcpi_ThermalZoneTemperature()[0]
+                if _WMI is None:
+                    import wmi
+                    _WMI = wmi.WMI(namespace="root\\wmi")
+                temp_info = _WMI.MSAcpi_ThermalZoneTemperature()[0]
                 return (temp_info.CurrentTemperature - 2732) / 10.0
             except:
                 return None
         else:
             return None
     except Exception as e:
-        logger.warning(f"Failed to get CPU temperature: {str(e)}")
+        logger.warning("Failed to get CPU temperature: %s", e)
         return None
 
+def get_net_io():
+    """Return (bytes_sent, bytes_recv) summed over all network interfaces"""
+    global _net_dev_fd
+    if _net_dev_fd is not None:
+        try:
+            sent = recv = 0
+            # Skip the two header lines; columns after 'iface:' are rx bytes ... tx bytes (9th)
+            for line in _pread_all(_net_dev_fd).split(b'\n')[2:]:
+                if b':' not in line:
+                    continue
+                fields = line.split(b':', 1)[1].split()
+                recv += int(fields[0])
+                sent += int(fields[8])
+            return sent, recv
+        except (OSError, ValueError, IndexError):
+            os.close(_net_dev_fd)
+            _net_dev_fd = None
+    net_io = psutil.net_io_counters()
+    return net_io.bytes_sent, net_io.bytes_recv
+
+def _meminfo_kb(buf, key):
+    """Extract the kB value of a /proc/meminfo field such as b'MemTotal:'"""
+    start = buf.index(key) + len(key)
+    return int(buf[start:buf.index(b'kB', start)])
+
+def get_memory_percent():
+    """Percentage of memory in use, computed like psutil from MemTotal/MemAvailable"""
+    global _meminfo_fd
+    if _meminfo_fd is not None:
+        try:
+            # Both fields are in the first few lines of /proc/meminfo
+            buf = os.pread(_meminfo_fd, 512, 0)
+            total = _meminfo_kb(buf, b'MemTotal:')
+            avail = _meminfo_kb(buf, b'MemAvailable:')
+            return round((total - avail) / total * 100, 1)
+        except (OSError, ValueError, ZeroDivisionError):
+            os.close(_meminfo_fd)
+            _meminfo_fd = None
+    return psutil.virtual_memory().percent
+
+def get_disk_percent(path='/'):
+    """Percentage of disk space in use, computed like psutil from statvfs"""
+    if hasattr(os, 'statvfs'):
+        st = os.statvfs(path)
+        used = st.f_blocks - st.f_bfree
+        total_user = used + st.f_bavail
+        return round(used / total_user * 100, 1) if total_user else 0.0
+    return psutil.disk_usage(path).percent
+
 def get_system_metrics():
     try:
-        net_io = psutil.net_io_counters()
+        net_sent, net_recv = get_net_io()
+        
+        if _slow_cache['ticks'] % SLOW_METRICS_EVERY == 0:
+            _slow_cache['disk'] = get_disk_percent('/')
+            _slow_cache['procs'] = len(psutil.pids())
+        _slow_cache['ticks'] += 1
         
         metrics = {
-            'cpu_percent': psutil.cpu_percent(interval=1),
-            'memory_percent': psutil.virtual_memory().percent,
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': get_memory_percent(),
             'temperature': get_cpu_temperature(),
-            'disk_percent': psutil.disk_usage('/').percent,
-            'network_sent': net_io.bytes_sent,
-            'network_recv': net_io.bytes_recv,
-            'boot_time': psutil.boot_time(),
-            'process_count': len(psutil.pids())
+            'disk_percent': _slow_cache['disk'],
+            'network_sent': net_sent,
+            'network_recv': net_recv,
+            'boot_time': _BOOT_TIME,
+            'process_count': _slow_cache['procs']
         }
         
-        historical_metrics.append(metrics)
-        if len(historical_metrics) > 60:
-            historical_metrics.pop(0)
+        historical_metrics.append(MetricSample(
+            metrics['cpu_percent'], metrics['memory_percent'], metrics['temperature'],
+            metrics['disk_percent'], metrics['network_sent'], metrics['network_recv'],
+            metrics['boot_time'], metrics['process_count']
+        ))
             
         return metrics
     except Exception as e:
-        logger.error(f"Error getting system metrics: {str(e)}")
+        logger.error("Error getting system metrics: %s", e)
         return {
             'cpu_percent': 0,
             'memory_percent': 0,
@@ -227,19 +524,29 @@ def get_system_metrics():
 
 # ---------------------- Simulation Setup ----------------------
 if SIMULATION:
+    # Simulate SIM_BATCH_TICKS virtual 0.5 s ticks per wake-up
+    SIM_TICK = 0.5
+    SIM_BATCH_TICKS = 20
+    _rng = np.random.default_rng() if np is not None else None
+    
+    def _binomial(n, p):
+        """Number of successes in n trials with probability p"""
+        if _rng is not None:
+            return int(_rng.binomial(n, p))
+        return sum(random.random() < p for _ in range(n))
+    
     def simulate_production():
-        global qtBon, qtRejet
         logger.info("Starting production simulation thread")
         while not stop_event.is_set():
             try:
                 if current_stop_reason is None:
-                    if random.random() < 0.7:
-                        qtBon += 1
-                    if random.random() < 0.1:
-                        qtRejet += 1
-                time_module.sleep(0.5)
+                    bon_delta = _binomial(SIM_BATCH_TICKS, 0.7)
+                    rej_delta = _binomial(SIM_BATCH_TICKS, 0.1)
+                    if bon_delta or rej_delta:
+                        counters.add(bon_delta, rej_delta)
+                stop_event.wait(SIM_TICK * SIM_BATCH_TICKS)
             except Exception as e:
-                logger.error(f"Simulation error: {str(e)}")
+                logger.error("Simulation error: %s", e)
                 time_module.sleep(1)
     
     sim_thread = threading.Thread(target=simulate_production, daemon=True)
@@ -248,33 +555,79 @@ if SIMULATION:
 # ---------------------- Shift Detection ----------------------
 def get_current_shift():
     try:
-        now = datetime.now().time()
-        
-        for shift in SHIFT_SCHEDULE:
-            if shift['start'] > shift['end']:
-                if now >= shift['start'] or now < shift['end']:
-                    return shift['name']
-            else:
-                if shift['start'] <= now < shift['end']:
-                    return shift['name']
-        
-        return "UNKNOWN"
+        now = datetime.now()
+        return _SHIFT_BY_MINUTE[now.hour * 60 + now.minute] or "UNKNOWN"
     except Exception as e:
-        logger.error(f"Shift detection error: {str(e)}")
+        logger.error("Shift detection error: %s", e)
         return "ERROR"
 
 # ---------------------- Data Collection ----------------------
+SOFTWARE_VERSION = "2.1.0"
+
+def _iso_utc_now():
+    """Current UTC time as 'YYYY-MM-DDTHH:MM:SSZ' without building a datetime"""
+    t = time_module.gmtime()
+    return '%04d-%02d-%02dT%02d:%02d:%02dZ' % (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+
+def format_duration(seconds):
+    """Render whole seconds as 'H:MM:SS' (hours are not wrapped into days)"""
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}"
+
+def build_payload_template():
+    """Payload skeleton holding the static fields, in wire order"""
+    return {
+        "machine_id": MACHINE_ID,
+        "timestamp": None,
+        "cycle_count": 0,
+        "state": None,
+        "qtBon": 0,
+        "qtRejet": 0,
+        "shift": None,
+        "system_metrics": None,
+        "software_version": SOFTWARE_VERSION,
+        "transmission_status": None,
+        "stop_reason": None,
+        "stop_time": None,
+        "last_stop_reason": None,
+        "last_stop_duration": None,
+        "last_stop_start": None
+    }
+
+# Rebuilt by save_settings when MACHINE_ID changes
+_PAYLOAD_TEMPLATE = build_payload_template()
+
+# Last full payload built during a stop, reused while nothing changes
+_last_payload = None
+_last_stop_key = None
+
 def collect_data():
-    global qtBon, qtRejet, current_stop_reason, stop_time, last_stop_info
+    global _last_payload, _last_stop_key
 
     try:
+        current_shift = get_current_shift()
+        stop_key = None
+        if current_stop_reason is not None:
+            stop_key = (current_stop_reason, stop_time, counters.snapshot(), current_shift, MACHINE_ID)
+            if stop_key == _last_stop_key:
+                # Only the stop fields are invariant; the GUI still draws live metrics
+                payload = _last_payload.copy()
+                payload["timestamp"] = _iso_utc_now()
+                payload["system_metrics"] = get_system_metrics()
+                payload["transmission_status"] = {
+                    "last_success": last_successful_transmission,
+                    "error_count": transmission_errors
+                }
+                return payload
+
         if SIMULATION:
             state = "RUNNING" if random.random() > 0.2 and current_stop_reason is None else "IDLE"
         else:
             if automationhat.input.one.read() and current_stop_reason is None:
-                qtBon += 1
+                counters.inc_good()
             if automationhat.input.two.read() and current_stop_reason is None:
-                qtRejet += 1
+                counters.inc_reject()
             state_pin = automationhat.input.three.read()
             state = "RUNNING" if state_pin and current_stop_reason is None else "IDLE"
 
@@ -285,68 +638,230 @@ def collect_data():
             stop_time_str = stop_time.strftime("%H:%M:%S") if stop_time else "Unknown time"
             display_state = f"STOPPED ({current_stop_reason} at {stop_time_str})"
         elif last_stop_info["reason"] is not None:
-            duration_str = str(last_stop_info["duration"]).split('.')[0]
+            duration_str = format_duration(last_stop_info["duration"].total_seconds())
             display_state = f"RUNNING (Last stop: {last_stop_info['reason']} for {duration_str})"
 
-        payload = {
-            "machine_id": MACHINE_ID,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "cycle_count": qtBon + qtRejet,
-            "state": display_state,
-            "qtBon": qtBon,
-            "qtRejet": qtRejet,
-            "shift": get_current_shift(),
-            "system_metrics": metrics,
-            "software_version": "2.1.0",
-            "transmission_status": {
-                "last_success": last_successful_transmission,
-                "error_count": transmission_errors
-            },
-            "stop_reason": current_stop_reason,
-            "stop_time": stop_time.isoformat() if stop_time else None,
-            "last_stop_reason": last_stop_info["reason"],
-            "last_stop_duration": str(last_stop_info["duration"]) if last_stop_info["duration"] else None,
-            "last_stop_start": last_stop_info["start_time"].isoformat() if last_stop_info["start_time"] else None
+        qtBon, qtRejet = counters.snapshot()
+        payload = _PAYLOAD_TEMPLATE.copy()
+        payload["timestamp"] = _iso_utc_now()
+        payload["cycle_count"] = qtBon + qtRejet
+        payload["state"] = display_state
+        payload["qtBon"] = qtBon
+        payload["qtRejet"] = qtRejet
+        payload["shift"] = current_shift
+        payload["system_metrics"] = metrics
+        payload["transmission_status"] = {
+            "last_success": last_successful_transmission,
+            "error_count": transmission_errors
         }
+        if current_stop_reason is not None:
+            payload["stop_reason"] = current_stop_reason
+        if stop_time:
+            payload["stop_time"] = stop_time.isoformat()
+        if last_stop_info["reason"] is not None:
+            payload["last_stop_reason"] = last_stop_info["reason"]
+        if last_stop_info["duration"]:
+            payload["last_stop_duration"] = format_duration(last_stop_info["duration"].total_seconds())
+        if last_stop_info["start_time"]:
+            payload["last_stop_start"] = last_stop_info["start_time"].isoformat()
 
+        _last_payload = payload
+        _last_stop_key = stop_key
         return payload
     except Exception as e:
-        logger.error(f"Data collection error: {str(e)}")
+        logger.error("Data collection error: %s", e)
         return {
             "machine_id": MACHINE_ID,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _iso_utc_now(),
             "error": str(e)
         }
 
+HEARTBEAT_EVERY = 6  # While stopped, sample only once per this many intervals
+_heartbeat_tick = 0
+_heartbeat_stop = None
+
+def _force_heartbeat():
+    """While stopped, True on the first tick of each stop and then every HEARTBEAT_EVERY ticks"""
+    global _heartbeat_tick, _heartbeat_stop
+    stop_key = (current_stop_reason, stop_time)
+    if stop_key != _heartbeat_stop:
+        _heartbeat_stop = stop_key
+        _heartbeat_tick = 0
+        return True
+    _heartbeat_tick += 1
+    if _heartbeat_tick >= HEARTBEAT_EVERY:
+        _heartbeat_tick = 0
+        return True
+    return False
+
 # ---------------------- TCP Send ----------------------
-def send_data(payload):
-    global last_successful_transmission, transmission_errors
-    
-    if SIMULATION:
-        time_module.sleep(0.1)
-        success = random.random() < 0.9
-        if success:
-            last_successful_transmission = datetime.now().isoformat()
-        else:
-            transmission_errors += 1
-        return success
-    else:
+def encode_payload(payload):
+    """Serialize payload to JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+def frame_payload(payload):
+    """Encode payload as a length-prefixed frame: 4-byte big-endian length + JSON body"""
+    body = encode_payload(payload)
+    return len(body).to_bytes(4, 'big') + body
+
+def _drain_server_messages(sock):
+    """Consume any heartbeats the server pushed, without blocking.
+    Returns True when at least one byte arrived."""
+    received = False
+    while select.select([sock], [], [], 0)[0]:
+        if not sock.recv(4096):
+            raise ConnectionError("Server closed the connection")
+        received = True
+    return received
+
+class NetworkSender:
+    """Send payloads from a dedicated asyncio loop thread.
+
+    The data thread only enqueues, so network stalls never delay sampling.
+    The queue is bounded and drops the oldest payload when full.
+    """
+    SEND_TIMEOUT = 5
+    RECONNECT_MIN = 1.0   # Seconds before the first reconnect retry
+    RECONNECT_MAX = 60.0  # Upper bound of the exponential backoff
+    HEARTBEAT_TIMEOUT = 30.0  # Server silence after which the connection is considered dead
+
+    def __init__(self, maxsize=64):
+        self._maxsize = maxsize
+        self._loop = asyncio.new_event_loop()
+        self._queue = None  # Created on the sender thread
+        # Persistent connection, only touched from the sender coroutine
+        self._sock = None
+        self._sock_addr = None
+        self._last_heartbeat = None  # Monotonic time of the last server push, None until one arrives
+        self._reconnect_delay = 0.0
+        self._thread = threading.Thread(target=self._run, name='net-sender', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Ask the sender to finish its queue and wait briefly for it"""
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._enqueue, None)
+            self._thread.join(timeout)
+
+    def submit(self, payload):
+        """Queue a payload for sending; thread-safe and never blocks"""
+        self._loop.call_soon_threadsafe(self._enqueue, payload)
+
+    def _enqueue(self, payload):
+        if self._queue.full():
+            self._queue.get_nowait()  # Telemetry is lossy: drop the oldest payload
+        self._queue.put_nowait(payload)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
         try:
-            with socket.create_connection((SERVER_IP, SERVER_PORT), timeout=5) as sock:
-                sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
-                ack = sock.recv(16).decode().strip()
-                if ack == "ACK":
-                    last_successful_transmission = datetime.now().isoformat()
-                    return True
+            self._loop.run_until_complete(self._worker())
+        finally:
+            self._close_socket()
+            self._loop.close()
+
+    async def _worker(self):
+        while True:
+            payload = await self._queue.get()
+            if payload is None:
+                break
+            if await self._send(payload):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Data sent successfully")
+            else:
+                logger.warning("Failed to send data")
+
+    def _close_socket(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._sock_addr = None
+        self._last_heartbeat = None
+
+    def _server_alive(self, sock):
+        """Record server heartbeats; False once a server that sends them has gone quiet"""
+        now = time_module.monotonic()
+        if _drain_server_messages(sock):
+            self._last_heartbeat = now
+            return True
+        # Servers that never push heartbeats are judged by send results alone
+        return self._last_heartbeat is None or now - self._last_heartbeat < self.HEARTBEAT_TIMEOUT
+
+    async def _get_socket(self):
+        """Return the persistent socket, connecting if needed"""
+        addr = (SERVER_IP, SERVER_PORT)
+        if self._sock is not None and self._sock_addr != addr:
+            self._close_socket()
+        if self._sock is None:
+            if self._reconnect_delay:
+                await asyncio.sleep(self._reconnect_delay)
+            sock = None
+            try:
+                infos = await self._loop.getaddrinfo(*addr, type=socket.SOCK_STREAM)
+                family, sock_type, proto, _, sockaddr = infos[0]
+                sock = socket.socket(family, sock_type, proto)
+                sock.setblocking(False)
+                await asyncio.wait_for(self._loop.sock_connect(sock, sockaddr), self.SEND_TIMEOUT)
+            except (OSError, asyncio.TimeoutError):
+                if sock is not None:
+                    sock.close()
+                # Back off exponentially while the server stays unreachable
+                self._reconnect_delay = min(max(self._reconnect_delay * 2, self.RECONNECT_MIN),
+                                            self.RECONNECT_MAX)
+                raise
+            except BaseException:
+                # Cancelled (e.g. at shutdown): clean up but leave the backoff alone
+                if sock is not None:
+                    sock.close()
+                raise
+            self._reconnect_delay = 0.0
+            # Telemetry frames are small and latency-sensitive: disable Nagle
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self._sock, self._sock_addr = sock, addr
+        return self._sock
+
+    async def _send(self, payload):
+        global last_successful_transmission, last_successful_transmission_mono, transmission_errors
+        
+        if SIMULATION:
+            await asyncio.sleep(0.1)
+            success = random.random() < 0.9
+            if success:
+                last_successful_transmission = datetime.now().isoformat()
+                last_successful_transmission_mono = time_module.monotonic()
+            else:
                 transmission_errors += 1
-                return False
-        except socket.error as e:
+            return success
+        
+        try:
+            sock = await self._get_socket()
+            if not self._server_alive(sock):
+                logger.warning("No server heartbeat for %.0f s, reconnecting", self.HEARTBEAT_TIMEOUT)
+                self._close_socket()
+                sock = await self._get_socket()
+            # Fire-and-forget: a completed sendall counts as delivered
+            await asyncio.wait_for(self._loop.sock_sendall(sock, frame_payload(payload)), self.SEND_TIMEOUT)
+            last_successful_transmission = datetime.now().isoformat()
+            last_successful_transmission_mono = time_module.monotonic()
+            return True
+        except OSError as e:
+            self._close_socket()
             transmission_errors += 1
-            logger.error(f"Socket error: {str(e)}")
+            logger.error("Socket error: %s", e)
             return False
         except Exception as e:
+            self._close_socket()
             transmission_errors += 1
-            logger.error(f"Transmission error: {str(e)}")
+            logger.error("Transmission error: %s", e)
             return False
 
 # ---------------------- Touchscreen-Optimized GUI ----------------------
@@ -367,14 +882,46 @@ class ProductionMonitor:
         }
         
         self.root = root
+        self.counters = counters
         self.style = ttk.Style()
         self.setup_gui()
+        # Dialogs are built once and reused to avoid recreating widgets per click
+        self._stop_dialog = self._build_stop_dialog()
+        self._settings_dialog = self._build_settings_dialog()
         
-        self.last_rate_calc_time = datetime.now()
+        self.last_rate_calc_time = time_module.monotonic()
         self.last_total_parts = 0
+        self._total_count = self.total_var.get()
         #self.last_oee_calc_time = datetime.now()
-        
+        self._last_payload = {}
+        self._boot_time = None
+        self._prev = {}  # Last value pushed to each variable/widget
+        self._last_shift = None
+        self._last_stopped = None
+        self._stop_btn_state = None
+        self._last_status = self.status_var.get()
+        # Clock strings are only reformatted when the second/day changes
+        self._last_sec = -1
+        self._last_timestr = ""
+        self._last_yday = -1
+        self._last_datestr = ""
+        # Status bar text is only rebuilt when transmission state changes
+        self._status_key = None
+        self._transmission_msg = "System ready"
+        # Email settings are not editable at runtime, so resolve this once
+        self._email_enabled = bool(config.get('EMAIL_CONFIG'))
+        
+        # Bound methods handed to after() are created once, not per call
+        self._update_clock_cb = self.update_clock
+        self._show_counters_cb = self._show_counters
+        
+        # Counter changes are pushed from whichever thread makes them
+        self.counters.on_change = self._counters_changed
+        self._show_counters()
+        # The data thread signals new payloads; live values refresh on a slow watchdog
+        self.root.bind("<<MetricsUpdated>>", self._drain_updates)
         self.update_gui()
+        self.update_clock()
     
     def setup_gui(self):
         self.root.title(f"Production Monitor ({'SIMULATION' if SIMULATION else 'LIVE'} MODE)")
@@ -391,7 +938,16 @@ class ProductionMonitor:
         self.style.configure('Counter.TLabel', font=('Arial', 24, 'bold'))
         self.style.configure('Large.TButton', font=('Arial', 14), padding=8)
         self.style.configure('Metrics.TLabel', font=('Arial', 12), background=self.BG_COLOR)
-        self.style.configure("Custom.Horizontal.TProgressbar", thickness=20)
+        # One preconfigured style per level; bars switch style instead of recoloring a shared one
+        self.style.configure("Good.Horizontal.TProgressbar", thickness=20, background=self.GOOD_COLOR)
+        self.style.configure("Warn.Horizontal.TProgressbar", thickness=20, background=self.WARNING_COLOR)
+        self.style.configure("Bad.Horizontal.TProgressbar", thickness=20, background=self.BAD_COLOR)
+        # Configure style for entry widgets in the settings dialog
+        self.style.configure('Settings.TEntry', 
+                            fieldbackground='white',  # Background color of the entry field
+                            foreground='black',      # Text color
+                            insertbackground='black', # Cursor color
+                            padding=5)
 
         # Main grid layout - using grid exclusively
         self.root.grid_rowconfigure(0, weight=1)
@@ -448,23 +1004,28 @@ class ProductionMonitor:
         production_frame.grid_columnconfigure(1, weight=1)
         production_frame.grid_columnconfigure(2, weight=1)
         
-        # Counters
+        # Counters (labels follow their variables, set together by _show_counters)
+        good_count, reject_count = self.counters.snapshot()
+        self.good_var = tk.IntVar(value=good_count)
+        self.reject_var = tk.IntVar(value=reject_count)
+        self.total_var = tk.IntVar(value=good_count + reject_count)
+        
         good_frame = ttk.Frame(production_frame)
         good_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=2)
         ttk.Label(good_frame, text="GOOD", font=('Arial', 14)).pack()
-        self.good_counter = ttk.Label(good_frame, text="0", style='Counter.TLabel')
+        self.good_counter = ttk.Label(good_frame, textvariable=self.good_var, style='Counter.TLabel')
         self.good_counter.pack()
         
         total_frame = ttk.Frame(production_frame)
         total_frame.grid(row=0, column=1, sticky="nsew", padx=5, pady=2)
         ttk.Label(total_frame, text="TOTAL", font=('Arial', 14)).pack()
-        self.total_counter = ttk.Label(total_frame, text="0", style='Counter.TLabel')
+        self.total_counter = ttk.Label(total_frame, textvariable=self.total_var, style='Counter.TLabel')
         self.total_counter.pack()
         
         reject_frame = ttk.Frame(production_frame)
         reject_frame.grid(row=0, column=2, sticky="nsew", padx=5, pady=2)
         ttk.Label(reject_frame, text="REJECT", font=('Arial', 14)).pack()
-        self.reject_counter = ttk.Label(reject_frame, text="0", style='Counter.TLabel')
+        self.reject_counter = ttk.Label(reject_frame, textvariable=self.reject_var, style='Counter.TLabel')
         self.reject_counter.pack()
         
         # Rates row
@@ -500,7 +1061,7 @@ class ProductionMonitor:
         self.cpu_label = ttk.Label(cpu_frame, textvariable=self.cpu_var, width=6, font=('Arial', 12))
         self.cpu_label.pack(side=tk.LEFT)
         self.cpu_bar = ttk.Progressbar(cpu_frame, orient=tk.HORIZONTAL, length=150, 
-                                     mode='determinate', style='Custom.Horizontal.TProgressbar')
+                                     mode='determinate', style='Good.Horizontal.TProgressbar')
         self.cpu_bar.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         
         # Memory
@@ -511,7 +1072,7 @@ class ProductionMonitor:
         self.mem_label = ttk.Label(mem_frame, textvariable=self.mem_var, width=6, font=('Arial', 12))
         self.mem_label.pack(side=tk.LEFT)
         self.mem_bar = ttk.Progressbar(mem_frame, orient=tk.HORIZONTAL, length=150, 
-                                     mode='determinate', style='Custom.Horizontal.TProgressbar')
+                                     mode='determinate', style='Good.Horizontal.TProgressbar')
         self.mem_bar.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         
         # Temperature
@@ -522,7 +1083,7 @@ class ProductionMonitor:
         self.temp_label = ttk.Label(temp_frame, textvariable=self.temp_var, width=6, font=('Arial', 12))
         self.temp_label.pack(side=tk.LEFT)
         self.temp_bar = ttk.Progressbar(temp_frame, orient=tk.HORIZONTAL, length=150, 
-                                      mode='determinate', style='Custom.Horizontal.TProgressbar')
+                                      mode='determinate', style='Good.Horizontal.TProgressbar')
         self.temp_bar.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         
         # Disk
@@ -533,7 +1094,7 @@ class ProductionMonitor:
         self.disk_label = ttk.Label(disk_frame, textvariable=self.disk_var, width=6, font=('Arial', 12))
         self.disk_label.pack(side=tk.LEFT)
         self.disk_bar = ttk.Progressbar(disk_frame, orient=tk.HORIZONTAL, length=150, 
-                                      mode='determinate', style='Custom.Horizontal.TProgressbar')
+                                      mode='determinate', style='Good.Horizontal.TProgressbar')
         self.disk_bar.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=5)
         
         # Network and uptime
@@ -581,82 +1142,136 @@ class ProductionMonitor:
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN, 
                              anchor=tk.W, font=('Arial', 10))
         status_bar.grid(row=5, column=0, sticky="ew", pady=(5, 0))
+    def _set_if_changed(self, var_name, value):
+        """Set a Tk variable only when its value actually changes"""
+        if self._prev.get(var_name) != value:
+            self._prev[var_name] = value
+            getattr(self, var_name).set(value)
+    
+    def _config_if_changed(self, widget, **options):
+        """Configure a widget only when the options differ from the last ones applied"""
+        key = (str(widget),) + tuple(options)  # Track each option set separately
+        if self._prev.get(key) != options:
+            self._prev[key] = options
+            widget.config(**options)
+    
     def update_metric_color(self, label, bar, value, warn_threshold, crit_threshold, max_value=100):
         if value is None:
-            color = self.BAD_COLOR
+            color, level = self.BAD_COLOR, 'Bad'
             value = 0
         elif value >= crit_threshold:
-            color = self.BAD_COLOR
+            color, level = self.BAD_COLOR, 'Bad'
         elif value >= warn_threshold:
-            color = self.WARNING_COLOR
+            color, level = self.WARNING_COLOR, 'Warn'
         else:
-            color = self.GOOD_COLOR
+            color, level = self.GOOD_COLOR, 'Good'
         
-        label.config(foreground=color)
-        bar['value'] = min(value, max_value)
-        self.style.configure("Custom.Horizontal.TProgressbar", background=color)
+        self._config_if_changed(label, foreground=color)
+        self._config_if_changed(bar, value=min(value, max_value))
+        self._config_if_changed(bar, style=f'{level}.Horizontal.TProgressbar')
         
+    def _counters_changed(self):
+        """Counters.on_change hook; may run on any thread, so hop onto the Tk loop"""
+        try:
+            self.root.after(0, self._show_counters_cb)
+        except (RuntimeError, tk.TclError):
+            pass  # Window is closing; the counters are still persisted
+    
+    def _show_counters(self):
+        """Push one consistent counter snapshot into the counter and rate labels"""
+        good_count, reject_count = self.counters.snapshot()
+        total_count = good_count + reject_count
+        self._set_if_changed('good_var', good_count)
+        self._set_if_changed('reject_var', reject_count)
+        self._total_count = total_count
+        self._set_if_changed('total_var', total_count)
+        if total_count > 0:
+            reject_rate = (reject_count / total_count) * 100
+            self._set_if_changed('reject_rate_var', f"Rejection Rate: {reject_rate:.1f}%")
+    
+    def _drain_updates(self, event=None):
+        """Handle <<MetricsUpdated>>: repaint from the newest queued payload"""
+        try:
+            self._last_payload = latest_payload.get_nowait()
+        except queue.Empty:
+            return
+        self.update_gui()
+    
     def update_gui(self):
+        """Repaint the widgets driven by the latest payload"""
         try:
-            data = collect_data()
-            
-            # Update time
-            now = datetime.now()
-            self.time_var.set(now.strftime("%H:%M:%S"))
-            self.date_var.set(now.strftime("%Y-%m-%d"))
+            data = self._last_payload
             
             # Update shift and state
             current_shift = data.get('shift', 'UNKNOWN')
-            self.shift_var.set(f"Shift: {current_shift}")
-            self.shift_indicator.config(bg=self.SHIFT_COLORS.get(current_shift, self.SHIFT_COLORS["UNKNOWN"]))
+            if current_shift != self._last_shift:  # Shift changes a few times a day
+                self.shift_var.set(f"Shift: {current_shift}")
+                self.shift_indicator.config(bg=self.SHIFT_COLORS.get(current_shift, self.SHIFT_COLORS["UNKNOWN"]))
+                self._last_shift = current_shift
             
             state = data.get('state', 'UNKNOWN')
-            self.state_var.set(state)
-            if "STOPPED" in state:
-                self.state_indicator.config(bg=self.BAD_COLOR, fg='white')
-            else:
-                self.state_indicator.config(bg=self.GOOD_COLOR, fg='black')
-            
-            # Update counters
-            good_count = data.get('qtBon', 0)
-            reject_count = data.get('qtRejet', 0)
-            total_count = good_count + reject_count
-            
-            self.good_counter.config(text=str(good_count))
-            self.reject_counter.config(text=str(reject_count))
-            self.total_counter.config(text=str(total_count))
-            
-            # Calculate rejection rate
-            if total_count > 0:
-                reject_rate = (reject_count / total_count) * 100
-                self.reject_rate_var.set(f"Rejection Rate: {reject_rate:.1f}%")
+            self._set_if_changed('state_var', state)
+            stopped = "STOPPED" in state
+            if stopped != self._last_stopped:
+                if stopped:
+                    self.state_indicator.config(bg=self.BAD_COLOR, fg='white')
+                else:
+                    self.state_indicator.config(bg=self.GOOD_COLOR, fg='black')
+                self._last_stopped = stopped
             
-            # Update system metrics
-            metrics = data.get('system_metrics', {})
+            # Update system metrics (look each value up once)
+            metrics = data.get('system_metrics') or {}
+            metrics_get = metrics.get
+            cpu_value = metrics_get('cpu_percent', 0)
+            mem_value = metrics_get('memory_percent', 0)
+            temp_value = metrics_get('temperature', 0)
+            disk_value = metrics_get('disk_percent', 0)
+            self._boot_time = metrics_get('boot_time')
             
-            cpu_value = metrics.get('cpu_percent', 0)
-            self.cpu_var.set(f"{cpu_value:.0f}%")
+            self._set_if_changed('cpu_var', f"{cpu_value:.0f}%")
             self.update_metric_color(self.cpu_label, self.cpu_bar, cpu_value, 70, 90)
             
-            mem_value = metrics.get('memory_percent', 0)
-            self.mem_var.set(f"{mem_value:.0f}%")
+            self._set_if_changed('mem_var', f"{mem_value:.0f}%")
             self.update_metric_color(self.mem_label, self.mem_bar, mem_value, 70, 90)
             
-            temp_value = metrics.get('temperature', 0)
-            self.temp_var.set(f"{temp_value:.0f}°C" if temp_value is not None else "N/A")
+            self._set_if_changed('temp_var', f"{temp_value:.0f}°C" if temp_value is not None else "N/A")
             self.update_metric_color(self.temp_label, self.temp_bar, temp_value, 60, 80, 100)
             
-            disk_value = metrics.get('disk_percent', 0)
-            self.disk_var.set(f"{disk_value:.0f}%")
+            self._set_if_changed('disk_var', f"{disk_value:.0f}%")
             self.update_metric_color(self.disk_label, self.disk_bar, disk_value, 70, 90)
             
+        except Exception as e:
+            logger.error("GUI update error: %s", e)
+            self._set_status(f"Error: {str(e)}")
+    
+    def _now_str(self):
+        """Current local time as 'HH:MM:SS', formatted at most once per second"""
+        t = time_module.time()
+        sec = int(t)
+        if sec != self._last_sec:
+            self._last_sec = sec
+            lt = time_module.localtime(t)
+            self._last_timestr = time_module.strftime("%H:%M:%S", lt)
+            if lt.tm_yday != self._last_yday:
+                self._last_yday = lt.tm_yday
+                self._last_datestr = time_module.strftime("%Y-%m-%d", lt)
+        return self._last_timestr
+    
+    def update_clock(self):
+        """Watchdog refresh of live values: clock, production rate, network, uptime and status bar"""
+        try:
+            # Update time
+            self._set_if_changed('time_var', self._now_str())
+            self._set_if_changed('date_var', self._last_datestr)
+            
             # Calculate production rate (parts per minute)
-            current_time = datetime.now()
-            time_diff = (current_time - self.last_rate_calc_time).total_seconds() / 60
+            total_count = self._total_count
+            current_time = time_module.monotonic()
+            time_diff = (current_time - self.last_rate_calc_time) / 60
             if time_diff > 1:  # Update rate every minute
                 parts_diff = total_count - self.last_total_parts
                 rate = parts_diff / time_diff
-                self.rate_var.set(f"Production Rate: {rate:.1f}/min")
+                self._set_if_changed('rate_var', f"Production Rate: {rate:.1f}/min")
                 self.last_rate_calc_time = current_time
                 self.last_total_parts = total_count
             
@@ -669,53 +1284,61 @@ class ProductionMonitor:
             #        self.oee_var.set(f"OEE: {oee:.0f}%")
             #    self.last_oee_calc_time = current_time
             
-            # Update network status
-            if last_successful_transmission:
-                time_since = (datetime.now() - datetime.fromisoformat(last_successful_transmission)).total_seconds()
-                if time_since < 10:
-                    self.network_status.config(text="Connected", fg=self.GOOD_COLOR)
-                elif time_since < 30:
-                    self.network_status.config(text="Warning", fg=self.WARNING_COLOR)
+            # Update network status, judged against the send period in effect
+            # (payloads only go out every HEARTBEAT_EVERY intervals during a stop)
+            if last_successful_transmission_mono is not None:
+                time_since = time_module.monotonic() - last_successful_transmission_mono
+                period = SAMPLING_INTERVAL * (HEARTBEAT_EVERY if current_stop_reason is not None else 1)
+                if time_since < 2 * period:
+                    self._config_if_changed(self.network_status, text="Connected", fg=self.GOOD_COLOR)
+                elif time_since < 6 * period:
+                    self._config_if_changed(self.network_status, text="Warning", fg=self.WARNING_COLOR)
                 else:
-                    self.network_status.config(text="Disconnected", fg=self.BAD_COLOR)
+                    self._config_if_changed(self.network_status, text="Disconnected", fg=self.BAD_COLOR)
             else:
-                self.network_status.config(text="Disconnected", fg=self.BAD_COLOR)
+                self._config_if_changed(self.network_status, text="Disconnected", fg=self.BAD_COLOR)
             
             # Update uptime
-            if 'boot_time' in metrics:
-                uptime_seconds = time_module.time() - metrics['boot_time']
-                uptime_str = str(timedelta(seconds=int(uptime_seconds)))
-                self.uptime_var.set(uptime_str)
+            if self._boot_time is not None:
+                uptime_seconds = time_module.time() - self._boot_time
+                self._set_if_changed('uptime_var', format_duration(uptime_seconds))
             
             # Update status bar
-            status_msg = "System ready"
-            if last_successful_transmission:
-                status_msg = f"Last transmission: {datetime.fromisoformat(last_successful_transmission).strftime('%H:%M:%S')}"
-                if transmission_errors > 0:
-                    status_msg += f" | Errors: {transmission_errors}"
-            self.status_var.set(status_msg)
+            status_key = (last_successful_transmission, transmission_errors)
+            if status_key != self._status_key:
+                self._status_key = status_key
+                status_msg = "System ready"
+                if last_successful_transmission:
+                    status_msg = f"Last transmission: {last_successful_transmission[11:19]}"  # HH:MM:SS of the ISO string
+                    if transmission_errors > 0:
+                        status_msg += f" | Errors: {transmission_errors}"
+                self._transmission_msg = status_msg
+            self._set_status(self._transmission_msg)
             
             # Update STOP/RUN button
             self.update_stop_button()
             
         except Exception as e:
-            logger.error(f"GUI update error: {str(e)}")
-            self.status_var.set(f"Error: {str(e)}")
+            logger.error("GUI update error: %s", e)
+            self._set_status(f"Error: {str(e)}")
         
-        self.root.after(500, self.update_gui)
+        self.root.after(1000, self._update_clock_cb)
     
     def update_stop_button(self):
-        if current_stop_reason is None:
-            self.stop_btn.config(text="STOP", style='Large.TButton')
-        else:
-            self.stop_btn.config(text="RUN", style='Large.TButton')
+        desired = "RUN" if current_stop_reason is not None else "STOP"
+        if desired != self._stop_btn_state:
+            self.stop_btn.config(text=desired)
+            self._stop_btn_state = desired
+    
+    def _set_status(self, msg):
+        """Set the status bar text, skipping the Tcl call when it is unchanged"""
+        if msg != self._last_status:
+            self._last_status = msg
+            self.status_var.set(msg)
     
     def reset_counters(self):
-        global qtBon, qtRejet
-        qtBon = 0
-        qtRejet = 0
-        save_counters(qtBon, qtRejet)  # Save the reset counters
-        self.status_var.set(f"Counters reset at {datetime.now().strftime('%H:%M:%S')}")
+        self.counters.reset()  # Also schedules a save
+        self._set_status(f"Counters reset at {self._now_str()}")
         logger.info("Production counters reset")
     
     def toggle_stop_run(self):
@@ -724,19 +1347,15 @@ class ProductionMonitor:
         else:
             self.set_stop_reason(None)
     
-    def show_stop_reasons(self):
+    def _build_stop_dialog(self):
+        """Create the stop reason dialog once; it is shown and hidden on demand"""
         stop_window = tk.Toplevel(self.root)
+        stop_window.withdraw()
         stop_window.title("Select Stop Reason")
         stop_window.geometry("400x350")
         stop_window.resizable(False, False)
         stop_window.configure(bg=self.BG_COLOR)
-        
-        # Position window near the stop button
-        stop_window.geometry(f"+{self.root.winfo_x()+200}+{self.root.winfo_y()+600}")
-        
-        # Make modal
-        stop_window.grab_set()
-        stop_window.focus_set()
+        stop_window.protocol("WM_DELETE_WINDOW", self._cancel_stop_reason)
         
         main_frame = ttk.Frame(stop_window, padding=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -745,15 +1364,17 @@ class ProductionMonitor:
         
         self.stop_reason_var = tk.StringVar()
         
+        # One radiobutton per reason, created once and kept for every open
+        reasons_frame = ttk.Frame(main_frame)
+        reasons_frame.pack(fill=tk.X)
         for reason in STOP_REASONS:
-            rb = ttk.Radiobutton(
-                main_frame, 
+            ttk.Radiobutton(
+                reasons_frame, 
                 text=reason, 
                 variable=self.stop_reason_var, 
                 value=reason,
                 style='TRadiobutton'
-            )
-            rb.pack(anchor=tk.W, pady=5)
+            ).pack(anchor=tk.W, pady=5)
         
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
@@ -761,16 +1382,41 @@ class ProductionMonitor:
         ttk.Button(
             button_frame, 
             text="Confirm", 
-            command=lambda: self.set_stop_reason(stop_window),
+            command=self._confirm_stop_reason,
             style='Large.TButton'
         ).pack(side=tk.RIGHT, padx=5)
         
         ttk.Button(
             button_frame, 
             text="Cancel", 
-            command=stop_window.destroy,
+            command=self._cancel_stop_reason,
             style='Large.TButton'
         ).pack(side=tk.RIGHT, padx=5)
+        
+        return stop_window
+    
+    def _show_dialog(self, window):
+        """Show a prebuilt dialog as a modal window"""
+        window.deiconify()
+        window.grab_set()
+        window.focus_set()
+    
+    def _hide_dialog(self, window):
+        """Release the modal grab and hide a prebuilt dialog"""
+        window.grab_release()
+        window.withdraw()
+    
+    def _confirm_stop_reason(self):
+        self.set_stop_reason(self._stop_dialog)
+    
+    def _cancel_stop_reason(self):
+        self._hide_dialog(self._stop_dialog)
+    
+    def show_stop_reasons(self):
+        self.stop_reason_var.set("")  # Clear the previous selection
+        # Position window near the stop button
+        self._stop_dialog.geometry(f"+{self.root.winfo_x()+200}+{self.root.winfo_y()+600}")
+        self._show_dialog(self._stop_dialog)
     
     def set_stop_reason(self, window):
         global current_stop_reason, stop_time, last_stop_info
@@ -785,43 +1431,37 @@ class ProductionMonitor:
                     "duration": duration,
                     "start_time": stop_time
                 }
-                duration_str = str(duration).split('.')[0]
-                self.status_var.set(f"Running (Last stop: {current_stop_reason} for {duration_str})")
-                logger.info(f"System running after stop: {current_stop_reason} for {duration_str}")
+                duration_str = format_duration(duration.total_seconds())
+                self._set_status(f"Running (Last stop: {current_stop_reason} for {duration_str})")
+                logger.info("System running after stop: %s for %s", current_stop_reason, duration_str)
             
             current_stop_reason = None
             stop_time = None
         elif reason:
             current_stop_reason = reason
             stop_time = now
-            time_str = stop_time.strftime("%H:%M:%S")
-            self.status_var.set(f"System stopped - Reason: {reason} at {time_str}")
-            logger.info(f"System stopped - Reason: {reason} at {time_str}")
+            time_str = self._now_str()
+            self._set_status(f"System stopped - Reason: {reason} at {time_str}")
+            logger.info("System stopped - Reason: %s at %s", reason, time_str)
             
-            # Send email notification in separate thread
-            if 'EMAIL_CONFIG' in config:
+            # Queue the email notification for the email worker
+            if self._email_enabled:
                 send_email_notification(reason, stop_time)
         
         self.update_stop_button()
+        sampler_wakeup.set()  # Sample now so the new state is shown and sent without delay
         if window:
-            window.destroy()
+            self._hide_dialog(window)
     
-    def show_settings(self):
+    def _build_settings_dialog(self):
+        """Create the settings dialog once; it is shown and hidden on demand"""
         settings_window = tk.Toplevel(self.root)
+        settings_window.withdraw()
         settings_window.title("System Settings")
         settings_window.geometry("500x400")
         settings_window.resizable(False, False)
         settings_window.configure(bg=self.BG_COLOR)
-        
-        settings_window.grab_set()
-        settings_window.focus_set()
-        
-        # Configure style for entry widgets
-        self.style.configure('Settings.TEntry', 
-                            fieldbackground='white',  # Background color of the entry field
-                            foreground='black',      # Text color
-                            insertbackground='black', # Cursor color
-                            padding=5)
+        settings_window.protocol("WM_DELETE_WINDOW", self._close_settings)
         
         main_frame = ttk.Frame(settings_window, padding=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -832,12 +1472,10 @@ class ProductionMonitor:
         
         ttk.Label(server_frame, text="Server IP:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
         self.ip_entry = ttk.Entry(server_frame, style='Settings.TEntry')
-        self.ip_entry.insert(0, SERVER_IP)
         self.ip_entry.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=5)
         
         ttk.Label(server_frame, text="Server Port:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
         self.port_entry = ttk.Entry(server_frame, style='Settings.TEntry')
-        self.port_entry.insert(0, str(SERVER_PORT))
         self.port_entry.grid(row=1, column=1, sticky=tk.EW, padx=5, pady=5)
         
         # Machine Settings
@@ -846,12 +1484,10 @@ class ProductionMonitor:
         
         ttk.Label(machine_frame, text="Machine ID:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
         self.id_entry = ttk.Entry(machine_frame, style='Settings.TEntry')
-        self.id_entry.insert(0, MACHINE_ID)
         self.id_entry.grid(row=0, column=1, sticky=tk.EW, padx=5, pady=5)
         
         ttk.Label(machine_frame, text="Sampling Interval (s):").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
         self.interval_entry = ttk.Entry(machine_frame, style='Settings.TEntry')
-        self.interval_entry.insert(0, str(SAMPLING_INTERVAL))
         self.interval_entry.grid(row=1, column=1, sticky=tk.EW, padx=5, pady=5)
 
         # Simulation Mode
@@ -866,112 +1502,139 @@ class ProductionMonitor:
         button_frame.pack(fill=tk.X, pady=10)
         
         ttk.Button(button_frame, text="Save", command=self.save_settings, style='Large.TButton').pack(side=tk.RIGHT, padx=1)
-        ttk.Button(button_frame, text="Cancel", command=settings_window.destroy, style='Large.TButton').pack(side=tk.RIGHT, padx=1)
+        ttk.Button(button_frame, text="Cancel", command=self._close_settings, style='Large.TButton').pack(side=tk.RIGHT, padx=1)
         
         server_frame.columnconfigure(1, weight=1)
         machine_frame.columnconfigure(1, weight=1)
+        
+        return settings_window
+    
+    def show_settings(self):
+        # Refresh the fields with the current settings
+        for entry, value in ((self.ip_entry, SERVER_IP), (self.port_entry, SERVER_PORT),
+                             (self.id_entry, MACHINE_ID), (self.interval_entry, SAMPLING_INTERVAL)):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        self.sim_var.set(SIMULATION)
+        self._show_dialog(self._settings_dialog)
+    
+    def _close_settings(self):
+        self._hide_dialog(self._settings_dialog)
     
     def save_settings(self):
-        global SERVER_IP, SERVER_PORT, MACHINE_ID, SAMPLING_INTERVAL, SIMULATION
+        global SERVER_IP, SERVER_PORT, MACHINE_ID, SAMPLING_INTERVAL, SIMULATION, _PAYLOAD_TEMPLATE
     
         try:
-            # Update the config dictionary
-            config['SERVER_IP'] = self.ip_entry.get()
-            if not config['SERVER_IP']:
+            # Validate into locals first
+            new_ip = self.ip_entry.get()
+            if not new_ip:
                 raise ValueError("Server IP cannot be empty")
         
             new_port = int(self.port_entry.get())
             if not (0 < new_port <= 65535):
                 raise ValueError("Port must be between 1 and 65535")
-            config['SERVER_PORT'] = new_port
         
             new_id = self.id_entry.get()
             if not new_id:
                 raise ValueError("Machine ID cannot be empty")
-            config['MACHINE_ID'] = new_id
         
             new_interval = float(self.interval_entry.get())
             if new_interval <= 0:
                 raise ValueError("Sampling interval must be positive")
-            config['SAMPLING_INTERVAL'] = new_interval
         
-            config['SIMULATION'] = self.sim_var.get()
+            new_simulation = self.sim_var.get()
         
-            # Save to YAML file
+            # Update the config dictionary and save to YAML file
+            config.update(
+                SERVER_IP=new_ip,
+                SERVER_PORT=new_port,
+                MACHINE_ID=new_id,
+                SAMPLING_INTERVAL=new_interval,
+                SIMULATION=new_simulation
+            )
             if not save_config(config):
                 raise Exception("Failed to save configuration file")
         
             # Update global variables
-            SERVER_IP = config['SERVER_IP']
-            SERVER_PORT = config['SERVER_PORT']
-            MACHINE_ID = config['MACHINE_ID']
-            SAMPLING_INTERVAL = config['SAMPLING_INTERVAL']
-            SIMULATION = config['SIMULATION']
+            SERVER_IP = new_ip
+            SERVER_PORT = new_port
+            MACHINE_ID = new_id
+            SAMPLING_INTERVAL = new_interval
+            SIMULATION = new_simulation
+            _PAYLOAD_TEMPLATE = build_payload_template()
+            sampler_wakeup.set()  # Apply the new interval without waiting out the old one
         
             messagebox.showinfo("Success", "Settings saved successfully")
-            logger.info(f"Settings updated - IP: {SERVER_IP}, Port: {SERVER_PORT}, "
-                    f"Machine ID: {MACHINE_ID}, Interval: {SAMPLING_INTERVAL}, "
-                    f"Simulation: {SIMULATION}")
+            logger.info("Settings updated - IP: %s, Port: %s, Machine ID: %s, Interval: %s, Simulation: %s",
+                        SERVER_IP, SERVER_PORT, MACHINE_ID, SAMPLING_INTERVAL, SIMULATION)
         
-            self.ip_entry.master.master.destroy()
+            self._close_settings()
         
         except ValueError as e:
             messagebox.showerror("Invalid Settings", str(e))
-            logger.error(f"Failed to save settings: {str(e)}")
+            logger.error("Failed to save settings: %s", e)
         except Exception as e:
             messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
-            logger.error(f"Unexpected error saving settings: {str(e)}")
+            logger.error("Unexpected error saving settings: %s", e)
     
     def confirm_exit(self):
         if messagebox.askyesno("Exit", "Are you sure you want to exit the application?"):
-            save_counters(qtBon, qtRejet)
-            stop_event.set()
-            time_module.sleep(0.5)
+            mark_counters_dirty()  # Written by the flush thread's final drain
+            request_stop()
             self.root.destroy()
 if __name__ == "__main__":
     logger.info("Starting Production Monitor...")
-    logger.info(f"Mode: {'SIMULATION' if SIMULATION else 'HARDWARE'}")
-    logger.info(f"Shift schedule: {[s['name'] for s in SHIFT_SCHEDULE]}")
-    logger.info(f"Current shift: {get_current_shift()}")
+    logger.info("Mode: %s", 'SIMULATION' if SIMULATION else 'HARDWARE')
+    logger.info("Shift schedule: %s", [s.name for s in SHIFT_SCHEDULE])
+    logger.info("Current shift: %s", get_current_shift())
     
     root = tk.Tk()
     app = ProductionMonitor(root)
     
+    sender = NetworkSender()
+    sender.start()
+    
     def data_loop():
-        global qtBon, qtRejet
         logger.info("Starting data transmission thread")
+        sampling_interval = SAMPLING_INTERVAL  # Re-read only when settings change
         while not stop_event.is_set():
             try:
-                data = collect_data()
-                logger.debug(f"Collected data: {json.dumps(data)}")
-                
+                # During a stop nothing changes, so only send a periodic heartbeat
+                if current_stop_reason is None or _force_heartbeat():
+                    data = collect_data()
+                    if publish_payload(data):
+                        root.event_generate("<<MetricsUpdated>>", when="tail")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Collected data: %s", encode_payload(data).decode("utf-8"))
+                    
+                    sender.submit(data)
                 
-                save_counters(qtBon, qtRejet)
-                if send_data(data):
-                    logger.info("Data sent successfully")
-                else:
-                    logger.warning("Failed to send data")
-                
-                for _ in range(int(SAMPLING_INTERVAL * 10)):
-                    if stop_event.is_set():
-                        break
-                    time_module.sleep(0.1)
-            except Exception as e:
-                logger.error(f"Data loop error: {str(e)}")
+                sampler_wakeup.wait(timeout=sampling_interval)
                 if stop_event.is_set():
                     break
-                time_module.sleep(1)
+                if sampler_wakeup.is_set():
+                    sampler_wakeup.clear()
+                    sampling_interval = SAMPLING_INTERVAL
+            except Exception as e:
+                logger.error("Data loop error: %s", e)
+                if stop_event.wait(1.0):
+                    break
     
     data_thread = threading.Thread(target=data_loop, daemon=True)
     data_thread.start()
     
+    flush_thread = threading.Thread(target=counters_flush_loop, daemon=True)
+    flush_thread.start()
+    
     def on_closing():
         app.confirm_exit()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
     
-    stop_event.set()
+    request_stop()
+    sender.stop()
+    flush_thread.join(timeout=2)
     logger.info("Program stopped")
 
 